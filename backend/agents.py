@@ -1,232 +1,589 @@
+import asyncio
+import functools
 import json
-from datetime import datetime, timezone
-from typing import Any, Optional, cast
-from pydantic import SecretStr
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Literal, Optional, Sequence, TypedDict, cast
+from pydantic import BaseModel, Field, SecretStr
 from langchain_openai import ChatOpenAI
-from langchain.agents import create_agent
-from langchain_core.messages import HumanMessage
-from langchain_core.tools import tool
-from config import supabase, OPENAI_API_KEY
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.graph import StateGraph, START, END
+from config import (supabase, OPENAI_API_KEY, PIPELINE_CACHE_DIR, PIPELINE_CACHE_MAX_SIZE, PIPELINE_CACHE_TTL,
+                    RESEARCH_CACHE_TTL)
+from db import get_pool, db_call, bump_data_version
 
-llm = ChatOpenAI(model="gpt-4o-mini", api_key=SecretStr(OPENAI_API_KEY) if OPENAI_API_KEY else None, temperature=0.7)
+try:
+    from gptcache.adapter import api as gptcache_api
+    from gptcache.embedding import Onnx
+    from gptcache.manager import manager_factory
+except ImportError:
+    gptcache_api = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how many sub-researchers a topic fans out to
+MAX_RESEARCH_ASPECTS = 4
+
+# Activity rows are queued and bulk-inserted by `activity_flush_loop`. Every row
+# goes through the queue and is stamped by the database as it is inserted, so the
+# feed is ordered by one clock in the order rows were logged. `None` stops the loop.
+_activity_queue: asyncio.Queue[Optional[tuple]] = asyncio.Queue()
+
+_INSERT_ACTIVITY = (
+    "INSERT INTO activity_log (agent_id, task_id, action, message, metadata, created_at) "
+    "VALUES ($1, $2, $3, $4, $5::jsonb, clock_timestamp())"
+)
 
 
 def log_activity(agent_id: str, task_id: str, action: str, message: str, metadata: Optional[dict] = None):
-    """Log agent activity to Supabase for real-time display."""
-    supabase.table("activity_log").insert({
-        "agent_id": agent_id,
-        "task_id": task_id,
-        "action": action,
-        "message": message,
-        "metadata": metadata or {}
-    }).execute()
-
-
-def update_agent_status(agent_id: str, status: str, task_id: Optional[str] = None):
-    """Update an agent's status in the database."""
-    data: dict[str, Any] = {
-        "status": status,
-        "last_active": datetime.now(timezone.utc).isoformat(),
-    }
-    if task_id:
-        data["current_task_id"] = task_id
-    else:
-        data["current_task_id"] = None
-    supabase.table("agents").update(data).eq("id", agent_id).execute()
+    """Queue agent activity for the next bulk insert into Supabase (non-blocking)."""
+    _activity_queue.put_nowait((agent_id, task_id, action, message, json.dumps(metadata or {})))
 
 
-def update_task(task_id: str, status: str, result: Optional[str] = None, assigned_agent_id: Optional[str] = None):
+async def _insert_activity(batch: list[tuple]):
+    """
+    Bulk insert queued activity rows. If the batch fails (e.g. a row's task was
+    removed by `/reset`), retry row by row so one bad row doesn't drop the rest.
+    """
+    pool = await get_pool()
+    try:
+        await pool.executemany(_INSERT_ACTIVITY, batch)
+    except Exception:
+        logger.warning("Bulk insert of %d activity rows failed, retrying one by one", len(batch), exc_info=True)
+        for row in batch:
+            try:
+                await pool.execute(_INSERT_ACTIVITY, *row)
+            except Exception:
+                logger.exception("Dropping activity row %r", row[2:4])
+    bump_data_version()
+
+
+async def _drain_activity(max_wait: float = 0.1, max_items: int = 100) -> tuple[list[tuple], bool]:
+    """
+    Wait for a queued row, then collect more for up to `max_wait` seconds.
+    Returns the batch and whether the stop marker was reached.
+    """
+    loop = asyncio.get_running_loop()
+    batch: list[tuple] = []
+    item = await _activity_queue.get()
+    deadline = loop.time() + max_wait
+    while item is not None:
+        batch.append(item)
+        timeout = deadline - loop.time()
+        if len(batch) >= max_items or timeout <= 0:
+            return batch, False
+        try:
+            item = await asyncio.wait_for(_activity_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return batch, False
+    return batch, True
+
+
+async def activity_flush_loop():
+    """Background task: flush queued activity rows in batches until `stop_activity_flush` is called."""
+    stopping = False
+    while not stopping:
+        batch, stopping = await _drain_activity()
+        if batch:
+            try:
+                await _insert_activity(batch)
+            except Exception:
+                logger.exception("Failed to flush %d activity rows", len(batch))
+
+
+async def stop_activity_flush(flush_task: asyncio.Task):
+    """Stop the flusher after it has inserted every row queued so far. Called on shutdown."""
+    _activity_queue.put_nowait(None)
+    await flush_task
+
+
+async def update_task(task_id: str, status: str, result: Optional[str] = None, assigned_agent_id: Optional[str] = None):
     """Update a task's status and result."""
-    data: dict[str, Any] = {
-        "status": status,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
-    }
+    data: dict[str, Any] = {"status": status}
     if result:
         data["result"] = result
     if assigned_agent_id:
         data["assigned_agent_id"] = assigned_agent_id
-    supabase.table("tasks").update(data).eq("id", task_id).execute()
+    assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(data, start=2))
+    pool = await get_pool()
+    await pool.execute(f"UPDATE tasks SET {assignments} WHERE id = $1", task_id, *data.values())
+    bump_data_version()
+
+
+async def transition(agent_id: str, agent_status: str, task_id: str, task_status: str,
+                     result: Optional[str] = None):
+    """Update an agent's status and its task's status/result together in one `transition` call."""
+    pool = await get_pool()
+    await pool.execute(
+        "SELECT transition($1, $2, $3, $4, $5)",
+        agent_id, agent_status, task_id, task_status, result,
+    )
+    bump_data_version()
+
+
+async def begin_step(agent_id: str, role: str, title: str, parent_task_id: str,
+                     handoffs: Sequence[tuple[str, str]] = ()) -> str:
+    """
+    Create a step's task and mark the agent as working in one `pipeline_step_begin`
+    call, then queue its handoff and "started" activity. Returns the new task id.
+    """
+    pool = await get_pool()
+    task_id = await pool.fetchval(
+        "SELECT pipeline_step_begin($1, $2, $3)",
+        title, parent_task_id, agent_id,
+    )
+    bump_data_version()
+    if not task_id:
+        raise ValueError(f"Failed to create {role} task")
+    task_id = str(task_id)
+    for handoff_agent_id, message in handoffs:
+        log_activity(handoff_agent_id, task_id, "handoff", message)
+    log_activity(agent_id, task_id, "started", f"{role.title()} agent picking up task")
+    return task_id
+
+
+# --- Structured output schemas for each agent role ---
+
+class ResearchPlan(BaseModel):
+    """Independent sub-aspects of a topic to research in parallel."""
+    aspects: list[str] = Field(description="Distinct sub-aspects of the topic, each researchable on its own")
+
+
+class ResearchFindings(BaseModel):
+    """Research findings on a topic."""
+    summary: str = Field(description="Short overview of the topic")
+    key_points: list[str] = Field(description="Key findings, one per item")
 
+    def to_text(self) -> str:
+        points = "\n".join(f"- {p}" for p in self.key_points)
+        return f"{self.summary}\n\nKey points:\n{points}"
 
-# --- Define Tools for each agent role ---
 
-@tool
-def search_knowledge(query: str) -> str:
-    """Search for information on a given topic. Returns research findings."""
-    # In a real app, you'd call a search API. Here the LLM simulates research.
-    return f"Research findings for: {query}"
+class Article(BaseModel):
+    """A finished article."""
+    title: str = Field(description="Article title")
+    body: str = Field(description="Full article text")
 
+    def to_text(self) -> str:
+        return f"# {self.title}\n\n{self.body}"
 
-@tool
-def write_content(topic: str, research: str) -> str:
-    """Write content based on research findings. Returns written content."""
-    return f"Written content about {topic} based on: {research}"
 
+class ReviewVerdict(BaseModel):
+    """A review of an article with a final verdict."""
+    verdict: Literal["APPROVED", "NEEDS_REVISION"]
+    reasoning: str = Field(description="Why the article received this verdict")
+    feedback: list[str] = Field(description="Specific, actionable suggestions")
 
-@tool
-def review_content(content: str) -> str:
-    """Review content for quality and accuracy. Returns review feedback."""
-    return f"Review of: {content}"
+    def to_text(self) -> str:
+        feedback = "\n".join(f"- {f}" for f in self.feedback)
+        return f"Verdict: {self.verdict}\n\n{self.reasoning}\n\nFeedback:\n{feedback}"
 
 
+# System prompts are the static prefix of every request for a role. Keep them
+# byte-identical across runs (no topic, dates or ids) so provider prompt caching
+# can reuse them; all per-run content goes in the HumanMessage.
 AGENT_CONFIGS = {
+    # Not a workspace agent: the researcher uses it to split a topic before fanning out
+    "planner": {
+        "system_prompt": """You are a Research Planner. Your job is to split a topic into sub-aspects.
+When given a topic, list 2 to 4 distinct aspects that can be researched independently.
+Return a single aspect if the topic is too narrow to split.""",
+        "schema": ResearchPlan,
+        "llm_kwargs": {"max_tokens": 200, "temperature": 0.3},
+    },
     "researcher": {
         "system_prompt": """You are a Research Agent. Your job is to research topics thoroughly.
 When given a task, research the topic and provide comprehensive findings.
-Always use the search_knowledge tool to gather information.
 Provide your findings in a clear, structured format with key points.""",
-        "tools": [search_knowledge],
+        "schema": ResearchFindings,
+        "llm_kwargs": {"max_tokens": 1500, "temperature": 0.7},
     },
     "writer": {
         "system_prompt": """You are a Writer Agent. Your job is to create well-written content.
 When given research findings, transform them into polished, engaging content.
-Use the write_content tool and then refine the output.
 Make sure the content is clear, well-organized, and engaging.""",
-        "tools": [write_content],
+        "schema": Article,
+        "llm_kwargs": {"max_tokens": 2000, "temperature": 0.7},
     },
     "reviewer": {
         "system_prompt": """You are a Reviewer Agent. Your job is to review and improve content.
 When given content, evaluate it for accuracy, clarity, and quality.
-Use the review_content tool and provide specific, actionable feedback.
+Provide specific, actionable feedback.
 Give a final verdict: APPROVED or NEEDS_REVISION with clear reasoning.""",
-        "tools": [review_content],
+        "schema": ReviewVerdict,
+        "llm_kwargs": {"max_tokens": 500, "temperature": 0.3},
     },
 }
 
 
+# One model per role, sized by its llm_kwargs. Each role's requests carry its own
+# prompt_cache_key so they are routed to the same OpenAI prompt cache.
+_LLMS = {
+    role: ChatOpenAI(
+        model=config.get("model", "gpt-4o-mini"),
+        api_key=SecretStr(OPENAI_API_KEY) if OPENAI_API_KEY else None,
+        model_kwargs={"prompt_cache_key": f"agent-{role}"},
+        **config["llm_kwargs"],
+    )
+    for role, config in AGENT_CONFIGS.items()
+}
+
+
+@functools.lru_cache(maxsize=None)
 def create_agent_executor(role: str):
-    """Create a LangGraph agent for a given role."""
-    config = AGENT_CONFIGS[role]
-    return create_agent(llm, config["tools"], system_prompt=config["system_prompt"])
+    """
+    Create the structured-output model for a given role.
+    Cached per role and shared safely across concurrent pipeline runs.
+    """
+    return _LLMS[role].with_structured_output(AGENT_CONFIGS[role]["schema"])
+
+
+async def invoke_agent(role: str, input_text: str) -> Any:
+    """Call a role's model on `input_text` and return its parsed structured output."""
+    executor = create_agent_executor(role)
+    return await executor.ainvoke([
+        SystemMessage(content=AGENT_CONFIGS[role]["system_prompt"]),
+        HumanMessage(content=input_text),
+    ])
+
+
+async def complete_step(agent_id: str, role: str, task_id: str, work: Awaitable[str]) -> str:
+    """Await a step's work on a task opened by `begin_step` and record the outcome in Supabase."""
+    try:
+        output = await work
+    except Exception as e:
+        log_activity(agent_id, task_id, "error", f"Agent encountered an error: {str(e)}")
+        await transition(agent_id, "idle", task_id, "failed", result=str(e))
+        raise
+
+    log_activity(agent_id, task_id, "completed", f"{role.title()} agent finished work",
+                 {"output_preview": output[:200]})
+    await transition(agent_id, "idle", task_id, "completed", result=output)
+    return output
 
 
 async def run_agent(agent_id: str, role: str, task_id: str, input_text: str) -> str:
-    """Run an agent on a task and update all statuses in Supabase."""
-    # Mark agent as working
-    update_agent_status(agent_id, "working", task_id)
-    update_task(task_id, "in_progress", assigned_agent_id=agent_id)
-    log_activity(agent_id, task_id, "started", f"{role.title()} agent picking up task")
+    """Run an agent on a task opened by `begin_step` and record the outcome in Supabase."""
+    async def work() -> str:
+        return (await invoke_agent(role, input_text)).to_text()
+    return await complete_step(agent_id, role, task_id, work())
+
+
+async def create_subtasks(parent_task_id: str, agent_id: str, titles: list[str]) -> list[str]:
+    """
+    Bulk insert in-progress child tasks assigned to `agent_id`. Returns their ids
+    in the order of `titles`, which must be unique.
+    """
+    pool = await get_pool()
+    rows = await pool.fetch(
+        "INSERT INTO tasks (title, status, parent_task_id, assigned_agent_id) "
+        "SELECT t.title, 'in_progress', $2, $3 FROM unnest($1::text[]) WITH ORDINALITY AS t(title, n) "
+        "ORDER BY t.n RETURNING id, title",
+        titles, parent_task_id, agent_id,
+    )
+    bump_data_version()
+    # RETURNING order isn't guaranteed, so map ids back by title
+    ids = {r["title"]: str(r["id"]) for r in rows}
+    return [ids[title] for title in titles]
+
+
+async def finish_subtasks(task_ids: list[str], results: list[Any]):
+    """Mark child tasks completed, or failed where their result is an exception, in one call."""
+    pool = await get_pool()
+    await pool.executemany(
+        "UPDATE tasks SET status = $2, result = $3 WHERE id = $1",
+        [(task_id, "failed" if isinstance(r, BaseException) else "completed", str(r))
+         for task_id, r in zip(task_ids, results)],
+    )
+    bump_data_version()
 
+
+async def research_in_parallel(agent_id: str, task_id: str, topic: str) -> str:
+    """
+    Split the topic into sub-aspects and research them concurrently as child
+    tasks, then merge the findings. Narrow topics are researched in one call.
+    """
+    plan: ResearchPlan = await invoke_agent("planner", topic)
+    aspects = list(dict.fromkeys(a.strip() for a in plan.aspects if a.strip()))[:MAX_RESEARCH_ASPECTS]
+    if len(aspects) < 2:
+        findings = await invoke_agent(
+            "researcher", f"Research the following topic thoroughly and provide detailed findings: {topic}")
+        return findings.to_text()
+
+    sub_task_ids = await create_subtasks(task_id, agent_id, [f"Research: {a}" for a in aspects])
+    results = await asyncio.gather(*[
+        invoke_agent("researcher", f"Research this aspect of {topic} thoroughly and provide detailed findings: {a}")
+        for a in aspects
+    ], return_exceptions=True)
+    results = [r if isinstance(r, BaseException) else r.to_text() for r in results]
+    await finish_subtasks(sub_task_ids, results)
+
+    sections = [f"## {a}\n\n{r}" for a, r in zip(aspects, results) if not isinstance(r, BaseException)]
+    if not sections:
+        raise cast(BaseException, results[0])
+    return "\n\n".join(sections)
+
+
+# --- Semantic cache for whole pipeline results (optional: requires gptcache) ---
+
+def _cached_at(message: str) -> float:
+    """When a cached pipeline entry was stored (0 if unknown)."""
     try:
-        executor = create_agent_executor(role)
-        result = await executor.ainvoke({"messages": [HumanMessage(content=input_text)]})
-        output = result["messages"][-1].content
+        entry = json.loads(message)
+    except (TypeError, ValueError):
+        return 0
+    return entry.get("cached_at", 0) if isinstance(entry, dict) else 0
 
-        log_activity(agent_id, task_id, "completed", f"{role.title()} agent finished work",
-                     {"output_preview": output[:200]})
 
-        # Mark agent as idle
-        update_agent_status(agent_id, "idle")
+def _newest_entry(messages: list[str], **kwargs: Any) -> str:
+    """
+    gptcache post-processor: pick the most recently cached of the candidates.
+    `put` never replaces an entry, so a topic's expired entries sit next to its
+    fresh one with the same similarity; this keeps them from shadowing it.
+    """
+    return max(messages, key=_cached_at)
+
+
+if gptcache_api is not None:
+    # Bounded store with LRU eviction, so expired entries are eventually deleted
+    _embedding = Onnx()
+    gptcache_api.init_similar_cache(
+        data_dir=PIPELINE_CACHE_DIR,
+        embedding=_embedding,
+        data_manager=manager_factory(
+            "sqlite,faiss",
+            data_dir=PIPELINE_CACHE_DIR,
+            vector_params={"dimension": _embedding.dimension},
+            max_size=PIPELINE_CACHE_MAX_SIZE,
+            eviction="LRU",
+        ),
+        post_func=_newest_entry,
+    )
 
-        return output
 
-    except Exception as e:
-        log_activity(agent_id, task_id, "error", f"Agent encountered an error: {str(e)}")
-        update_agent_status(agent_id, "idle")
-        update_task(task_id, "failed", result=str(e))
-        raise
+def normalize_topic(topic: str) -> str:
+    """Lowercase and collapse whitespace so trivially different topics share cache keys."""
+    return " ".join(topic.lower().split())
 
 
-async def run_pipeline(topic: str):
+async def get_cached_pipeline_result(topic: str) -> Optional[dict[str, str]]:
+    """
+    Return a previous pipeline result for this (or a near-identical) topic, if one
+    was cached within PIPELINE_CACHE_TTL seconds. Cache errors count as misses.
+    """
+    if gptcache_api is None:
+        return None
+    try:
+        cached = await asyncio.to_thread(gptcache_api.get, normalize_topic(topic))
+        entry = json.loads(cached) if cached else None
+    except Exception:
+        logger.exception("Pipeline cache lookup failed; treating as a miss")
+        return None
+    if not isinstance(entry, dict) or time.time() - entry.get("cached_at", 0) > PIPELINE_CACHE_TTL:
+        return None
+    return entry.get("result")
+
+
+async def cache_pipeline_result(topic: str, result: dict[str, str]):
+    """Store a finished pipeline result in the semantic cache. Failures are logged, not raised."""
+    if gptcache_api is None:
+        return
+    entry = json.dumps({"cached_at": time.time(), "result": result})
+    try:
+        await asyncio.to_thread(gptcache_api.put, normalize_topic(topic), entry)
+    except Exception:
+        logger.exception("Failed to store pipeline result in the cache")
+
+
+# --- Research memory: recent findings per topic (research_cache table) ---
+
+async def get_cached_research(topic: str) -> Optional[str]:
+    """Return findings researched for this topic within RESEARCH_CACHE_TTL seconds, if any."""
+    pool = await get_pool()
+    return await pool.fetchval(
+        "SELECT findings FROM research_cache "
+        "WHERE topic_norm = $1 AND created_at >= now() - make_interval(secs => $2)",
+        normalize_topic(topic), RESEARCH_CACHE_TTL,
+    )
+
+
+async def cache_research(topic: str, findings: str):
+    """Remember fresh research findings for this topic."""
+    pool = await get_pool()
+    await pool.execute(
+        "INSERT INTO research_cache (topic_norm, findings, created_at) VALUES ($1, $2, now()) "
+        "ON CONFLICT (topic_norm) DO UPDATE SET findings = EXCLUDED.findings, created_at = EXCLUDED.created_at",
+        normalize_topic(topic), findings,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_agent_ids() -> dict[str, str]:
     """
-    Run the full multi-agent pipeline:
-    1. Researcher researches the topic
-    2. Writer creates content from research
-    3. Reviewer reviews the final content
+    Map each agent role to its id. The agents table rarely changes, so this is
+    cached for the process; call `get_agent_ids.cache_clear()` to reload.
     """
-    # Fetch agents from DB
-    agents_res = supabase.table("agents").select("*").execute()
-    if not agents_res.data:
+    res = supabase.table("agents").select("id, role").execute()
+    if not res.data:
         raise ValueError("No agents found in database")
-    agents_data = cast(list[dict[str, Any]], agents_res.data)
-    agents = {a["role"]: a for a in agents_data}
+    agent_ids = {a["role"]: str(a["id"]) for a in cast(list[dict[str, Any]], res.data)}
     for role in ("researcher", "writer", "reviewer"):
-        if role not in agents:
+        if role not in agent_ids:
             raise ValueError(f"Agent with role '{role}' not found in database")
+    return agent_ids
+
+
+# --- Pipeline graph: research -> write -> review ---
+
+class PipelineState(TypedDict, total=False):
+    topic: str
+    main_task_id: str
+    agent_ids: dict[str, str]
+    research: str
+    article: str
+    review: str
+
+
+async def research_node(state: PipelineState) -> dict[str, Any]:
+    """Researcher researches the topic, unless it was researched recently."""
+    topic, ids = state["topic"], state["agent_ids"]
+    findings = await get_cached_research(topic)
+    if findings is not None:
+        pool = await get_pool()
+        task_id = await pool.fetchval(
+            "INSERT INTO tasks (title, status, parent_task_id, assigned_agent_id, result) "
+            "VALUES ($1, $2, $3, $4, $5) RETURNING id",
+            f"Research: {topic}", "completed", state["main_task_id"], ids["researcher"], findings,
+        )
+        bump_data_version()
+        log_activity(ids["researcher"], str(task_id), "memory_hit",
+                     "Researcher reusing recent findings for this topic")
+        return {"research": findings}
+
+    task_id = await begin_step(
+        ids["researcher"], "researcher", f"Research: {topic}", state["main_task_id"],
+        [(ids["researcher"], "Task assigned to Researcher agent")],
+    )
+    research = await complete_step(
+        ids["researcher"], "researcher", task_id,
+        research_in_parallel(ids["researcher"], task_id, topic),
+    )
+    await cache_research(topic, research)
+    return {"research": research}
 
-    # Create the main task
-    main_task_res = supabase.table("tasks").insert({
-        "title": f"Create content about: {topic}",
-        "description": f"Full pipeline: research, write, and review content about {topic}",
-        "status": "pending"
-    }).execute()
-    if not main_task_res.data:
-        raise ValueError("Failed to create main task")
-    main_task_id: str = str(cast(list[dict[str, Any]], main_task_res.data)[0]["id"])
-
-    # --- Step 1: Research ---
-    research_task_res = supabase.table("tasks").insert({
-        "title": f"Research: {topic}",
-        "status": "pending",
-        "parent_task_id": main_task_id
-    }).execute()
-    if not research_task_res.data:
-        raise ValueError("Failed to create research task")
-    research_task_id: str = str(cast(list[dict[str, Any]], research_task_res.data)[0]["id"])
-
-    log_activity(str(agents["researcher"]["id"]), research_task_id, "handoff",
-                 "Task assigned to Researcher agent")
-
-    research_result = await run_agent(
-        str(agents["researcher"]["id"]),
-        "researcher",
-        research_task_id,
-        f"Research the following topic thoroughly and provide detailed findings: {topic}"
+
+async def write_node(state: PipelineState) -> dict[str, Any]:
+    """Writer creates content from research (handoff from researcher)."""
+    topic, ids = state["topic"], state["agent_ids"]
+    task_id = await begin_step(
+        ids["writer"], "writer", f"Write: {topic}", state["main_task_id"],
+        [(ids["researcher"], "Researcher handing off to Writer agent"),
+         (ids["writer"], "Writer agent receiving research findings")],
     )
-    update_task(research_task_id, "completed", result=research_result)
-
-    # --- Step 2: Write (handoff from researcher) ---
-    write_task_res = supabase.table("tasks").insert({
-        "title": f"Write: {topic}",
-        "status": "pending",
-        "parent_task_id": main_task_id
-    }).execute()
-    if not write_task_res.data:
-        raise ValueError("Failed to create write task")
-    write_task_id: str = str(cast(list[dict[str, Any]], write_task_res.data)[0]["id"])
-
-    log_activity(str(agents["researcher"]["id"]), write_task_id, "handoff",
-                 "Researcher handing off to Writer agent")
-    log_activity(str(agents["writer"]["id"]), write_task_id, "handoff",
-                 "Writer agent receiving research findings")
-
-    write_result = await run_agent(
-        str(agents["writer"]["id"]),
+    article = await run_agent(
+        ids["writer"],
         "writer",
-        write_task_id,
-        f"Based on the following research, write a polished article about {topic}:\n\n{research_result}"
+        task_id,
+        f"Based on the following research, write a polished article about {topic}:\n\n{state['research']}"
+    )
+    return {"article": article}
+
+
+async def review_node(state: PipelineState) -> dict[str, Any]:
+    """Reviewer reviews the final content (handoff from writer)."""
+    topic, ids = state["topic"], state["agent_ids"]
+    task_id = await begin_step(
+        ids["reviewer"], "reviewer", f"Review: {topic}", state["main_task_id"],
+        [(ids["writer"], "Writer handing off to Reviewer agent"),
+         (ids["reviewer"], "Reviewer agent receiving content for review")],
     )
-    update_task(write_task_id, "completed", result=write_result)
-
-    # --- Step 3: Review (handoff from writer) ---
-    review_task_res = supabase.table("tasks").insert({
-        "title": f"Review: {topic}",
-        "status": "pending",
-        "parent_task_id": main_task_id
-    }).execute()
-    if not review_task_res.data:
-        raise ValueError("Failed to create review task")
-    review_task_id: str = str(cast(list[dict[str, Any]], review_task_res.data)[0]["id"])
-
-    log_activity(str(agents["writer"]["id"]), review_task_id, "handoff",
-                 "Writer handing off to Reviewer agent")
-    log_activity(str(agents["reviewer"]["id"]), review_task_id, "handoff",
-                 "Reviewer agent receiving content for review")
-
-    review_result = await run_agent(
-        str(agents["reviewer"]["id"]),
+    review = await run_agent(
+        ids["reviewer"],
         "reviewer",
-        review_task_id,
-        f"Review the following article for quality, accuracy, and clarity:\n\n{write_result}"
+        task_id,
+        f"Review the following article for quality, accuracy, and clarity:\n\n{state['article']}"
     )
-    update_task(review_task_id, "completed", result=review_result)
+    return {"review": review}
+
+
+def build_pipeline_graph():
+    """Compile the researcher -> writer -> reviewer pipeline as a LangGraph graph."""
+    graph = StateGraph(PipelineState)
+    graph.add_node("research", research_node)
+    graph.add_node("write", write_node)
+    graph.add_node("review", review_node)
+    graph.add_edge(START, "research")
+    graph.add_edge("research", "write")
+    graph.add_edge("write", "review")
+    graph.add_edge("review", END)
+    return graph.compile()
+
+
+pipeline_graph = build_pipeline_graph()
+
+
+async def stream_pipeline(topic: str) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Run the full multi-agent pipeline, yielding events as it goes:
+    1. Researcher researches the topic -> ("research_complete", findings)
+    2. Writer creates content from research -> ("write_complete", article)
+    3. Reviewer reviews the final content -> ("review_complete", review)
+    and finally ("pipeline_complete", final_result).
+    Identical or near-identical topics are served from the semantic cache.
+    """
+    pool = await get_pool()
+    cached = await get_cached_pipeline_result(topic)
+    if cached is not None:
+        await pool.execute(
+            "INSERT INTO tasks (title, description, status, result) VALUES ($1, $2, $3, $4)",
+            f"Create content about: {topic}",
+            f"Full pipeline: research, write, and review content about {topic} (served from cache)",
+            "completed",
+            json.dumps(cached),
+        )
+        bump_data_version()
+        yield "pipeline_complete", cached
+        return
+
+    agent_ids = await db_call(get_agent_ids)
+
+    # Create the main task
+    main_task_id = await pool.fetchval(
+        "INSERT INTO tasks (title, description, status) VALUES ($1, $2, $3) RETURNING id",
+        f"Create content about: {topic}",
+        f"Full pipeline: research, write, and review content about {topic}",
+        "pending",
+    )
+    if not main_task_id:
+        raise ValueError("Failed to create main task")
+    bump_data_version()
+
+    state: dict[str, Any] = {}
+    async for update in pipeline_graph.astream({
+        "topic": topic,
+        "main_task_id": str(main_task_id),
+        "agent_ids": agent_ids,
+    }, stream_mode="updates"):
+        for node, values in update.items():
+            state.update(values)
+            yield f"{node}_complete", next(iter(values.values()))
 
     # Mark main task as completed
     final_result = {
-        "research": research_result,
-        "article": write_result,
-        "review": review_result
+        "research": state["research"],
+        "article": state["article"],
+        "review": state["review"]
     }
-    update_task(main_task_id, "completed", result=json.dumps(final_result))
+    await update_task(str(main_task_id), "completed", result=json.dumps(final_result))
+    await cache_pipeline_result(topic, final_result)
+
+    yield "pipeline_complete", final_result
 
-    return final_result
\ No newline at end of file
+
+async def run_pipeline(topic: str):
+    """Run the full multi-agent pipeline to completion and return its final result."""
+    final_result = None
+    async for event, data in stream_pipeline(topic):
+        if event == "pipeline_complete":
+            final_result = data
+    return final_result
@@ -1,14 +1,56 @@
+import importlib.util
 import os
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from supabase.client import ClientOptions
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+# Direct Postgres connection string, used for the pipeline's hot-path writes
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Where gptcache keeps the semantic pipeline cache (only used if gptcache is installed)
+PIPELINE_CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", "./gptcache_agents")
+# How long (seconds) a cached pipeline result is served for a topic
+PIPELINE_CACHE_TTL = int(os.getenv("PIPELINE_CACHE_TTL", "86400"))
+# Most entries the semantic cache keeps before evicting the least recently used
+PIPELINE_CACHE_MAX_SIZE = int(os.getenv("PIPELINE_CACHE_MAX_SIZE", "1000"))
+# How long (seconds) researched findings for a topic are reused
+RESEARCH_CACHE_TTL = int(os.getenv("RESEARCH_CACHE_TTL", "86400"))
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in environment")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
\ No newline at end of file
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL must be set in environment")
+
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    options=ClientOptions(postgrest_client_timeout=10, storage_client_timeout=10),
+)
+
+# Swap PostgREST's default session for one shared keep-alive client, so every
+# table/rpc call reuses pooled connections instead of new TLS handshakes. HTTP/2
+# needs the optional `h2` package (`pip install httpx[http2]`); without it the
+# client falls back to HTTP/1.1 keep-alive.
+_default_session = supabase.postgrest.session
+supabase.postgrest.session = httpx.Client(
+    base_url=_default_session.base_url,
+    headers=_default_session.headers,
+    timeout=_default_session.timeout,
+    follow_redirects=_default_session.follow_redirects,
+    verify=getattr(supabase.postgrest, "verify", True),
+    proxy=getattr(supabase.postgrest, "proxy", None),
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+_default_session.close()
+
+# Dedicated, bounded pool for blocking supabase-py calls so they can't starve
+# the default executor under concurrent pipelines
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=20, thread_name_prefix="supabase")
\ No newline at end of file
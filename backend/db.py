@@ -0,0 +1,54 @@
+import asyncio
+import functools
+from typing import Any, Callable, Optional, TypeVar
+import asyncpg
+from config import DATABASE_URL, DB_EXECUTOR
+
+T = TypeVar("T")
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+# Bumped after every write so cached API responses can be dropped eagerly
+_data_version = 0
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Return the shared Postgres connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    dsn=DATABASE_URL,
+                    min_size=10,
+                    max_size=50,
+                    max_inactive_connection_lifetime=300,
+                    # Supavisor's transaction pooler doesn't support prepared statements
+                    statement_cache_size=0,
+                )
+    return _pool
+
+
+async def close_pool():
+    """Close the shared pool, if it was opened."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def db_call(fn: Callable[..., T], *args: Any) -> T:
+    """Run a blocking Supabase client call on the bounded DB executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, functools.partial(fn, *args))
+
+
+def data_version() -> int:
+    """Return a counter that changes whenever the backend writes to the database."""
+    return _data_version
+
+
+def bump_data_version():
+    """Mark cached reads as stale after a write."""
+    global _data_version
+    _data_version += 1
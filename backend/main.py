@@ -1,11 +1,37 @@
 import asyncio
-from fastapi import FastAPI, HTTPException
+import hashlib
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Coroutine, Optional
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from config import supabase
-from agents import run_pipeline
+from sse_starlette.sse import EventSourceResponse
+from config import supabase, DB_EXECUTOR
+from agents import run_pipeline, stream_pipeline, activity_flush_loop, stop_activity_flush, get_agent_ids
+from db import get_pool, close_pool, db_call, data_version, bump_data_version
 
-app = FastAPI(title="Multi-Agent Task Coordinator")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the Postgres pool and start the activity flusher; drain and close everything on shutdown."""
+    await get_pool()
+    flush_task = asyncio.create_task(activity_flush_loop())
+    yield
+    await stop_activity_flush(flush_task)
+    await close_pool()
+    DB_EXECUTOR.shutdown(wait=False)
+    session = supabase.postgrest.session
+    logger.info("Closing shared Supabase HTTP session (already closed: %s)", session.is_closed)
+    session.close()
+
+
+app = FastAPI(title="Multi-Agent Task Coordinator", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,29 +50,86 @@ class ResetRequest(BaseModel):
     pass
 
 
+# Running pipeline tasks. The event loop only keeps weak references to tasks, so
+# hold them here until they finish (e.g. after an SSE client disconnects).
+_pipeline_tasks: set[asyncio.Task] = set()
+
+
+def start_pipeline_task(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Run `coro` as a task that stays alive until it finishes."""
+    task = asyncio.create_task(coro)
+    _pipeline_tasks.add(task)
+    task.add_done_callback(_pipeline_tasks.discard)
+    return task
+
+
+# Short-lived cache for the polled read endpoints, keyed by endpoint name
+_response_cache: dict[str, dict[str, Any]] = {}
+
+
+async def cached_response(request: Request, key: str, ttl: float, fetch: Callable[[], Any]) -> Response:
+    """
+    Serve `fetch().data` from a `ttl`-second in-process cache with an ETag.
+    `fetch` is a blocking Supabase call and runs on the DB executor.
+    Entries are also dropped as soon as the backend writes to the database.
+    """
+    entry = _response_cache.get(key)
+    if entry is None or time.monotonic() - entry["ts"] >= ttl or entry["version"] != data_version():
+        version = data_version()
+        result = await db_call(fetch)
+        body = json.dumps(result.data, sort_keys=True)
+        entry = {
+            "ts": time.monotonic(),
+            "version": version,
+            "body": body,
+            "etag": f'"{hashlib.md5(body.encode()).hexdigest()}"',
+        }
+        _response_cache[key] = entry
+
+    headers = {"ETag": entry["etag"]}
+    if request.headers.get("if-none-match") == entry["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
 @app.get("/agents")
-async def get_agents():
+async def get_agents(request: Request):
     """Get all agents and their current status."""
-    result = supabase.table("agents").select("*").execute()
-    return result.data
+    return await cached_response(request, "agents", 0.5,
+                                 (supabase.table("agents")
+                                  .select("id, name, role, status, current_task_id, last_active")
+                                  .execute))
 
 
 @app.get("/tasks")
-async def get_tasks():
-    """Get all tasks ordered by creation time."""
-    result = supabase.table("tasks").select("*").order("created_at", desc=True).execute()
+async def get_tasks(request: Request):
+    """Get all tasks ordered by creation time, without results (see `/tasks/{task_id}`)."""
+    return await cached_response(request, "tasks", 1.0,
+                                 (supabase.table("tasks")
+                                  .select("id, title, description, status, assigned_agent_id, parent_task_id, "
+                                          "created_at, updated_at")
+                                  .order("created_at", desc=True)
+                                  .execute))
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: uuid.UUID):
+    """Get a single task, including its result. Non-UUID ids are rejected before reaching PostgREST."""
+    result = await db_call(supabase.table("tasks").select("*").eq("id", str(task_id)).maybe_single().execute)
+    if result is None or not result.data:
+        raise HTTPException(status_code=404, detail="Task not found")
     return result.data
 
 
 @app.get("/activity")
-async def get_activity():
+async def get_activity(request: Request):
     """Get recent activity log."""
-    result = (supabase.table("activity_log")
-              .select("*, agents(name, role)")
-              .order("created_at", desc=True)
-              .limit(50)
-              .execute())
-    return result.data
+    return await cached_response(request, "activity", 1.0,
+                                 (supabase.table("activity_log")
+                                  .select("id, action, message, created_at, agents(name, role)")
+                                  .order("created_at", desc=True)
+                                  .limit(50)
+                                  .execute))
 
 
 @app.post("/tasks/run")
@@ -56,20 +139,48 @@ async def create_and_run_task(request: TaskRequest):
         raise HTTPException(status_code=400, detail="Topic cannot be empty")
 
     # Run pipeline in background so we can return immediately
-    asyncio.create_task(run_pipeline(request.topic))
+    start_pipeline_task(run_pipeline(request.topic))
 
     return {"message": "Pipeline started", "topic": request.topic}
 
 
+async def pipeline_event_stream(topic: str) -> AsyncIterator[dict[str, str]]:
+    """
+    Relay pipeline events as SSE messages. The pipeline runs in its own task,
+    so a client disconnecting doesn't abandon a half-finished run.
+    """
+    queue: asyncio.Queue[Optional[dict[str, str]]] = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for event, data in stream_pipeline(topic):
+                await queue.put({"event": event, "data": data if isinstance(data, str) else json.dumps(data)})
+        except Exception as e:
+            await queue.put({"event": "error", "data": str(e)})
+        finally:
+            await queue.put(None)
+
+    producer = start_pipeline_task(produce())
+    while (message := await queue.get()) is not None:
+        yield message
+    await producer
+
+
+@app.post("/tasks/run/stream")
+async def create_and_stream_task(request: TaskRequest):
+    """Submit a topic and stream each agent's result back as Server-Sent Events."""
+    if not request.topic.strip():
+        raise HTTPException(status_code=400, detail="Topic cannot be empty")
+
+    return EventSourceResponse(pipeline_event_stream(request.topic))
+
+
 @app.post("/reset")
 async def reset_workspace():
     """Reset all agents to idle and clear tasks/activity."""
-    supabase.table("activity_log").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
-    supabase.table("tasks").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
-    supabase.table("agents").update({
-        "status": "idle",
-        "current_task_id": None
-    }).neq("id", "00000000-0000-0000-0000-000000000000").execute()
+    await db_call(supabase.rpc("reset_workspace").execute)
+    bump_data_version()
+    get_agent_ids.cache_clear()
     return {"message": "Workspace reset"}
 
 
@@ -26,6 +26,7 @@ const ACTION_ICONS: Record<string, string> = {
   started: "▶️",
   completed: "✅",
   handoff: "🤝",
+  memory_hit: "🧠",
   error: "❌",
 };
 
@@ -120,6 +121,15 @@ export default function Home() {
     setActivity(activityRes);
   }
 
+  async function selectTask(task: Task | null) {
+    setSelectedTask(task);
+    if (!task || task.result) return;
+    const detail: Task = await fetch(`${API_URL}/tasks/${task.id}`).then((r) =>
+      r.json(),
+    );
+    setSelectedTask((prev) => (prev?.id === detail.id ? detail : prev));
+  }
+
   async function handleSubmit(e: React.FormEvent) {
     e.preventDefault();
     if (!topic.trim() || loading) return;
@@ -246,9 +256,7 @@ export default function Home() {
                   <div
                     className="p-4 cursor-pointer hover:bg-gray-800/50 transition"
                     onClick={() =>
-                      setSelectedTask(
-                        selectedTask?.id === task.id ? null : task,
-                      )
+                      selectTask(selectedTask?.id === task.id ? null : task)
                     }
                   >
                     <div className="flex items-center justify-between">
@@ -273,7 +281,7 @@ export default function Home() {
                         <div
                           key={sub.id}
                           className="px-4 py-3 border-b border-gray-800/50 last:border-0 flex items-center justify-between cursor-pointer hover:bg-gray-800/30"
-                          onClick={() => setSelectedTask(sub)}
+                          onClick={() => selectTask(sub)}
                         >
                           <div className="flex items-center gap-2">
                             <span className="text-gray-600">↳</span>
@@ -21,18 +21,20 @@ export type Task = {
   status: "pending" | "in_progress" | "handoff" | "completed" | "failed";
   assigned_agent_id: string | null;
   parent_task_id: string | null;
-  result: string | null;
+  // Omitted from the /tasks list; fetched from /tasks/{id} when a task is opened
+  result?: string | null;
   created_at: string;
   updated_at: string;
 };
 
 export type ActivityLog = {
   id: string;
-  agent_id: string;
-  task_id: string;
+  // Omitted from the /activity list, which embeds the agent's name and role instead
+  agent_id?: string;
+  task_id?: string;
   action: string;
   message: string;
-  metadata: Record<string, unknown>;
+  metadata?: Record<string, unknown>;
   created_at: string;
   agents?: { name: string; role: string };
 };
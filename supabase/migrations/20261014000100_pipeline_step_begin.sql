@@ -0,0 +1,22 @@
+-- Start a pipeline step in a single round-trip: create the step's task row and
+-- mark the agent as working on it. Returns the new task id. The step's activity
+-- rows are queued and bulk-inserted by the backend.
+CREATE OR REPLACE FUNCTION pipeline_step_begin(
+    p_title text,
+    p_parent_task_id uuid,
+    p_agent_id uuid
+) RETURNS uuid AS $$
+DECLARE
+    v_task_id uuid;
+BEGIN
+    INSERT INTO tasks (title, status, parent_task_id, assigned_agent_id)
+    VALUES (p_title, 'in_progress', p_parent_task_id, p_agent_id)
+    RETURNING id INTO v_task_id;
+
+    UPDATE agents
+    SET status = 'working', current_task_id = v_task_id, last_active = now()
+    WHERE id = p_agent_id;
+
+    RETURN v_task_id;
+END;
+$$ LANGUAGE plpgsql;
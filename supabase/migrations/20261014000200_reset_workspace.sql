@@ -0,0 +1,16 @@
+-- Clear tasks and activity and idle every agent in one transaction.
+-- Agents are detached from their tasks first; tasks are deleted rather than
+-- truncated with CASCADE, which would also empty agents via current_task_id.
+-- `WHERE true` satisfies pg_safeupdate, which Supabase loads for PostgREST
+-- calls and which rejects UPDATE/DELETE without a WHERE clause.
+CREATE OR REPLACE FUNCTION reset_workspace() RETURNS void AS $$
+BEGIN
+    UPDATE agents SET status = 'idle', current_task_id = NULL WHERE true;
+    DELETE FROM activity_log WHERE true;
+    DELETE FROM tasks WHERE true;
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
+-- Only the backend (service role) may reset the workspace; PostgREST would
+-- otherwise expose /rpc/reset_workspace to anon and authenticated clients.
+REVOKE EXECUTE ON FUNCTION reset_workspace() FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,20 @@
+-- Move an agent and its task to new statuses in one round-trip.
+CREATE OR REPLACE FUNCTION transition(
+    p_agent uuid,
+    p_agent_status text,
+    p_task uuid,
+    p_task_status text,
+    p_result text DEFAULT NULL
+) RETURNS void AS $$
+    UPDATE agents
+    SET status = p_agent_status,
+        current_task_id = CASE WHEN p_agent_status = 'working' THEN p_task ELSE NULL END,
+        last_active = now()
+    WHERE id = p_agent;
+
+    UPDATE tasks
+    SET status = p_task_status,
+        result = COALESCE(p_result, result),
+        updated_at = now()
+    WHERE id = p_task;
+$$ LANGUAGE sql;
@@ -0,0 +1,12 @@
+-- Recent research findings keyed by normalized topic, so repeat topics can
+-- skip the researcher step.
+CREATE TABLE IF NOT EXISTS research_cache (
+    topic_norm text PRIMARY KEY,
+    findings text NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Backend-only: with RLS on and no policies, anon/authenticated clients can't
+-- read or plant findings. The backend's direct connection owns the table and
+-- bypasses RLS.
+ALTER TABLE research_cache ENABLE ROW LEVEL SECURITY;
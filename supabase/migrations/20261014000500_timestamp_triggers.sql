@@ -0,0 +1,62 @@
+-- Stamp tasks.updated_at and agents.last_active on every update, so callers
+-- don't have to send them.
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_last_active() RETURNS trigger AS $$
+BEGIN
+    NEW.last_active := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tasks_upd ON tasks;
+CREATE TRIGGER trg_tasks_upd BEFORE UPDATE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS trg_agents_upd ON agents;
+CREATE TRIGGER trg_agents_upd BEFORE UPDATE ON agents
+    FOR EACH ROW EXECUTE FUNCTION set_last_active();
+
+-- The triggers now own the timestamps
+CREATE OR REPLACE FUNCTION transition(
+    p_agent uuid,
+    p_agent_status text,
+    p_task uuid,
+    p_task_status text,
+    p_result text DEFAULT NULL
+) RETURNS void AS $$
+    UPDATE agents
+    SET status = p_agent_status,
+        current_task_id = CASE WHEN p_agent_status = 'working' THEN p_task ELSE NULL END
+    WHERE id = p_agent;
+
+    UPDATE tasks
+    SET status = p_task_status,
+        result = COALESCE(p_result, result)
+    WHERE id = p_task;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION pipeline_step_begin(
+    p_title text,
+    p_parent_task_id uuid,
+    p_agent_id uuid
+) RETURNS uuid AS $$
+DECLARE
+    v_task_id uuid;
+BEGIN
+    INSERT INTO tasks (title, status, parent_task_id, assigned_agent_id)
+    VALUES (p_title, 'in_progress', p_parent_task_id, p_agent_id)
+    RETURNING id INTO v_task_id;
+
+    UPDATE agents
+    SET status = 'working', current_task_id = v_task_id
+    WHERE id = p_agent_id;
+
+    RETURN v_task_id;
+END;
+$$ LANGUAGE plpgsql;